@@ -1,14 +1,30 @@
 import pandas as pd
 import json
+import os
+from raw_archive import RawArchive, ARCHIVE_DIR, archive_is_current
 
-# Load the data from the text file
-df = pd.read_csv('warsaw_rentals.txt')
+# Stream the payloads from the raw archive if it is up to date, otherwise load the text file
+archive = None
+if archive_is_current(ARCHIVE_DIR, 'warsaw_rentals.txt'):
+    try:
+        archive = RawArchive(ARCHIVE_DIR)
+        print(f"Reading payloads from {ARCHIVE_DIR}")
+        rows = enumerate(archive.iter_rows())
+    except (OSError, ValueError) as e:
+        print(f"Could not open {ARCHIVE_DIR}: {e}")
+if archive is None:
+    if os.path.exists(ARCHIVE_DIR):
+        print(f"{ARCHIVE_DIR} is unusable or older than warsaw_rentals.txt, "
+              "run `python raw_archive.py import` to update it")
+    print("Reading payloads from warsaw_rentals.txt")
+    df = pd.read_csv('warsaw_rentals.txt')
+    rows = df.iterrows()
 
 # Create an empty list to store the processed data
 processed_data = []
 
 # Process each row in the dataframe
-for index, row in df.iterrows():
+for index, row in rows:
     try:
         # Create a default dictionary with NaN values for all fields
         processed_row = {
@@ -99,6 +115,9 @@ for index, row in df.iterrows():
         processed_row['url'] = row.get('url', pd.NA)  # At least preserve the URL if available
         processed_data.append(processed_row)
 
+if archive is not None:
+    archive.close()
+
 # Create a new dataframe from the processed data
 result_df = pd.DataFrame(processed_data)
 
@@ -0,0 +1,722 @@
+import argparse
+import ast
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import runpy
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+import raw_archive
+
+# Constants
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(REPO_DIR, 'benchmark_baseline.json')
+SEARCH_PATH = '/pl/wyniki/wynajem/mieszkanie/mazowieckie/warszawa/warszawa/warszawa'
+ASCII_SLUG = str.maketrans('ąćęłńóśźż ', 'acelnoszz-')
+NEXT_DATA_TEMPLATE = '<script id="__NEXT_DATA__" type="application/json" crossorigin="anonymous">{}</script>'
+
+# Vocabulary used to build synthetic otodom ads
+DISTRICTS = {
+    'Śródmieście': ['Powiśle', 'Muranów', 'Śródmieście Południowe', 'Mirów', 'Stare Miasto'],
+    'Mokotów': ['Górny Mokotów', 'Służew', 'Stegny', 'Sadyba', 'Wierzbno'],
+    'Wola': ['Czyste', 'Koło', 'Młynów', 'Odolany', 'Powązki'],
+    'Praga-Południe': ['Saska Kępa', 'Gocław', 'Grochów', 'Kamionek'],
+    'Ursynów': ['Kabaty', 'Natolin', 'Imielin'],
+    'Wilanów': ['Zawady', 'Powsin'],
+    'Białołęka': ['Tarchomin', 'Nowodwory', 'Choszczówka'],
+    'Targówek': ['Bródno', 'Zacisze'],
+    'Ochota': ['Rakowiec', 'Szczęśliwice'],
+    'Bielany': ['Chomiczówka'],
+    'Żoliborz': ['Marymont'],
+    'Wawer': ['Falenica', 'Anin', 'Międzylesie'],
+    'Bemowo': [],
+    'Praga-Północ': [],
+    'Włochy': ['Latawiec'],
+    'Ursus': [],
+    'Wesoła': [],
+    'Rembertów': [],
+}
+UNMAPPED_DISTRICTS = ['Kępa Potocka', 'Wawrzyszew', 'Szmulowizna']
+STREETS = ['Marszałkowska', 'Puławska', 'Grzybowska', 'Prosta', 'Bruna', 'Grochowska',
+           'Wołoska', 'Jana Pawła II', 'Targowa', 'Płocka', 'Kasprowicza', 'KEN']
+HEATING = ['urban', 'gas', 'electrical', 'boiler_room', 'other']
+FLOORS = ['ground_floor', 'floor_1', 'floor_2', 'floor_3', 'floor_4', 'floor_5', 'floor_6',
+          'floor_7', 'floor_8', 'floor_9', 'floor_10', 'floor_higher_10', 'cellar', 'garret']
+CONSTRUCTION_STATUS = ['ready_to_use', 'to_completion', 'to_renovation']
+USER_TYPES = ['agency', 'private', 'developer']
+BUILDING_TYPES = ['block', 'apartment', 'tenement', 'ribbon', 'house', 'infill', 'loft']
+BUILDING_MATERIALS = ['brick', 'concrete_plate', 'concrete', 'silikat', 'reinforced_concrete', 'other']
+WINDOWS_TYPES = ['plastic', 'wooden', 'aluminium']
+EXTRAS_TYPES = ['balcony', 'lift', 'garage', 'basement', 'separate_kitchen', 'air_conditioning',
+                'terrace', 'garden', 'two_storey', 'usable_room']
+EQUIPMENT_TYPES = ['fridge', 'oven', 'stove', 'washing_machine', 'dishwasher', 'tv', 'furniture']
+SECURITY_TYPES = ['entryphone', 'monitoring', 'closed_area', 'anti_burglary_door', 'roller_shutters', 'alarm']
+MEDIA_TYPES = ['internet', 'cable-television', 'phone']
+DESCRIPTION_WORDS = ['mieszkanie', 'do', 'wynajęcia', 'w', 'nowym', 'budynku', 'z', 'balkonem',
+                     'blisko', 'metra', 'słoneczne', 'ciche', 'umeblowane', 'kuchnia', 'salon',
+                     'sypialnia', 'łazienka', 'garaż', 'komórka', 'lokatorska', 'od', 'zaraz',
+                     'Zapraszam', 'na', 'oglądanie', 'czynsz', 'media', 'kaucja', 'okolica', 'park']
+
+# Features the prediction form in rental_price_app.py can produce
+APP_DISTRICTS = ['Śródmieście', 'Wola', 'Mokotów', 'Praga-Południe', 'Ursynów', 'Wilanów', 'Ochota',
+                 'Bielany', 'Żoliborz', 'Bemowo', 'Białołęka', 'Targówek', 'Włochy', 'Praga-Północ',
+                 'Ursus', 'Other']
+APP_STANDARDIZED = ['area', 'distance_to_center', 'building_floors_num', 'floor_numeric',
+                    'build_year', 'relative_floor_position']
+APP_FEATURES = (
+    [f'{feature}_std' for feature in APP_STANDARDIZED]
+    + ['rooms_num', 'is_top_floor']
+    + [f'district_{district}' for district in APP_DISTRICTS]
+    + ['building_type_apartment', 'building_type_tenement', 'window_plastic', 'window_wooden',
+       'user_type_agency', 'kitchen_furniture_score', 'security_score', 'tech_score',
+       'premium_amenities_score', 'infrastructure_score', 'interior_score', 'area_per_room',
+       'area_distance_interaction', 'high_premium_district', 'building_age', 'top_floor_distance']
+)
+HIGH_PREMIUM_DISTRICTS = ['district_Śródmieście', 'district_Wola', 'district_Żoliborz', 'district_Wilanów']
+
+# Stages whose buffers live in zstd's C library, which tracemalloc cannot see
+NATIVE_MEMORY_STAGES = {'archive_import', 'archive_decode', 'archive_get', 'flatten_archive'}
+
+
+def maybe(rng, value, probability=0.9):
+    """Return value most of the time, None otherwise (otodom leaves many fields empty)"""
+    return value if rng.random() < probability else None
+
+
+def sample(rng, values, low=0, high=None):
+    """Pick a random subset of values, preserving their order"""
+    high = len(values) if high is None else high
+    chosen = set(rng.sample(values, rng.randint(low, high)))
+    return [value for value in values if value in chosen]
+
+
+def make_ad(rng, listing_id, base_url):
+    """Build a synthetic `ad` payload shaped like props.pageProps.ad on otodom"""
+    public_id = f"{listing_id:x}"
+    district = rng.choice(list(DISTRICTS) + UNMAPPED_DISTRICTS)
+    neighbourhoods = DISTRICTS.get(district, [])
+    if neighbourhoods and rng.random() < 0.4:
+        district = rng.choice(neighbourhoods)
+    street = rng.choice(STREETS)
+    rooms = rng.choice(['1', '2', '2', '3', '3', '4', '5', 'more'])
+    area = round(rng.uniform(18, 160), 2)
+    price = int(round(rng.uniform(1800, 15000), -1))
+    rent = int(round(rng.uniform(0, 1200), -1))
+    # A few listings put the rent in grosze, which 2-4.ipynb corrects
+    if rng.random() < 0.01:
+        rent *= 100
+    building_floors = rng.randint(1, 30)
+    slug = f"mieszkanie-do-wynajecia-warszawa-ul-{street.lower().translate(ASCII_SLUG)}-ID{public_id}"
+    description = ' '.join(rng.choice(DESCRIPTION_WORDS) for _ in range(rng.randint(80, 400)))
+
+    target = {
+        'Area': str(area),
+        'Price': price,
+        'Rent': maybe(rng, rent),
+        'Deposit': maybe(rng, price + rng.choice([0, 500, 1000])),
+        'Rooms_num': [rooms],
+        'Heating': [rng.choice(HEATING)] if rng.random() < 0.8 else None,
+        'Floor_no': [rng.choice(FLOORS)] if rng.random() < 0.95 else None,
+        'Building_floors_num': maybe(rng, str(building_floors)),
+        'Construction_status': [rng.choice(CONSTRUCTION_STATUS)] if rng.random() < 0.7 else None,
+        'user_type': rng.choice(USER_TYPES),
+        'Extras_types': sample(rng, EXTRAS_TYPES, 0, 5),
+        'Build_year': maybe(rng, str(rng.randint(1890, 2025)), 0.75),
+        'Building_type': [rng.choice(BUILDING_TYPES)] if rng.random() < 0.85 else None,
+        'Building_material': [rng.choice(BUILDING_MATERIALS)] if rng.random() < 0.6 else None,
+        'Windows_type': [rng.choice(WINDOWS_TYPES)] if rng.random() < 0.7 else None,
+        'Equipment_types': sample(rng, EQUIPMENT_TYPES, 0, 6),
+        'Security_types': sample(rng, SECURITY_TYPES, 0, 4),
+        'Media_types': sample(rng, MEDIA_TYPES, 0, 3),
+        'City': 'warszawa',
+        'Country': 'Polska',
+        'OfferType': 'wynajem',
+        'ProperType': 'mieszkanie',
+        'Province': 'mazowieckie',
+        'Id': str(listing_id),
+    }
+    images = []
+    for _ in range(rng.randint(4, 20)):
+        image_hash = ''.join(rng.choice('0123456789abcdef') for _ in range(40))
+        images.append({
+            size: f"https://ireland.apollo.olxcdn.com/v1/files/{image_hash}/image;s={dimensions}"
+            for size, dimensions in [('thumbnail', '184x138'), ('small', '314x236'),
+                                     ('medium', '655x491'), ('large', '1280x1024')]
+        })
+
+    return {
+        'id': listing_id,
+        'publicId': public_id,
+        'slug': slug,
+        'title': f"{rooms}-pokojowe mieszkanie {area} m² ul. {street}",
+        'advertType': 'AGENCY' if target['user_type'] == 'agency' else 'PRIVATE',
+        'createdAt': f"2025-0{rng.randint(1, 5)}-{rng.randint(10, 28)}T10:00:00+02:00",
+        'modifiedAt': f"2025-05-{rng.randint(10, 28)}T12:00:00+02:00",
+        'description': f"<p>{description}</p>",
+        'url': f"{base_url}/pl/oferta/{slug}",
+        'characteristics': [
+            {'key': 'price', 'value': str(price), 'label': 'Cena', 'localizedValue': f"{price} zł"},
+            {'key': 'm', 'value': str(area), 'label': 'Powierzchnia', 'localizedValue': f"{area} m²"},
+            {'key': 'rooms_num', 'value': rooms, 'label': 'Liczba pokoi', 'localizedValue': rooms},
+            {'key': 'rent', 'value': str(rent), 'label': 'Czynsz', 'localizedValue': f"{rent} zł"},
+        ],
+        'images': images,
+        'owner': {'id': rng.randint(1, 10 ** 7), 'name': 'Właściciel', 'type': target['user_type'],
+                  'phones': [f"+48 {rng.randint(500, 899)} {rng.randint(100, 999)} {rng.randint(100, 999)}"]},
+        'location': {
+            'coordinates': {'latitude': round(rng.uniform(52.10, 52.36), 6),
+                            'longitude': round(rng.uniform(20.85, 21.25), 6)},
+            'address': {
+                'street': maybe(rng, {'name': f"ul. {street}", 'number': str(rng.randint(1, 200))}, 0.85),
+                'district': maybe(rng, {'code': district.lower(), 'name': district}, 0.95),
+                'city': {'code': 'warszawa', 'name': 'Warszawa'},
+                'province': {'code': 'mazowieckie', 'name': 'Mazowieckie'},
+            },
+            'mapDetails': {'radius': 0, 'zoom': 15},
+        },
+        'target': target,
+    }
+
+
+def render_listing_page(ad):
+    """Render a listing page embedding the ad the way otodom's Next.js pages do"""
+    next_data = {
+        'props': {'pageProps': {'ad': ad, 'lang': 'pl', 'relatedAds': []}},
+        'page': '/[lang]/ad/[slug]',
+        'query': {'lang': 'pl', 'slug': ad['slug']},
+        'buildId': 'benchmark',
+    }
+    return (
+        '<!DOCTYPE html><html lang="pl"><head><meta charset="utf-8">'
+        f"<title>{ad['title']}</title></head><body><div id=\"__next\"><main>"
+        f"<h1>{ad['title']}</h1>{ad['description']}</main></div>"
+        + NEXT_DATA_TEMPLATE.format(json.dumps(next_data))
+        + '</body></html>'
+    )
+
+
+def render_search_page(ads):
+    """Render a search results page with one listing card per ad"""
+    cards = []
+    for ad in ads:
+        cards.append(
+            '<article class="css-136g1q2" data-cy="listing-item">'
+            f"<a data-cy=\"listing-item-link\" href=\"{ad['url']}\">"
+            f"<p class=\"css-u3orbr\">{ad['title']}</p></a>"
+            f"<span class=\"css-1uwck7i\">{ad['target']['Price']} zł</span>"
+            f"<dl class=\"css-uki0wd\"><dt>Powierzchnia</dt><dd>{ad['target']['Area']} m²</dd></dl>"
+            '</article>'
+        )
+    return (
+        '<!DOCTYPE html><html lang="pl"><head><meta charset="utf-8"></head><body>'
+        '<div data-cy="search.listing.organic"><ul>'
+        + ''.join(f"<li>{card}</li>" for card in cards)
+        + '</ul></div></body></html>'
+    )
+
+
+def generate_fixtures(num_listings, per_page, base_url, seed):
+    """Generate search pages and listing pages keyed by request path"""
+    rng = random.Random(seed)
+    ads = [make_ad(rng, 60000000 + i, base_url) for i in range(num_listings)]
+    routes = {}
+    search_urls = []
+    for page, start in enumerate(range(0, num_listings, per_page), start=1):
+        path = f"{SEARCH_PATH}?viewType=listing&page={page}"
+        routes[path] = render_search_page(ads[start:start + per_page]).encode('utf-8')
+        search_urls.append(base_url + path)
+    for ad in ads:
+        routes[ad['url'][len(base_url):]] = render_listing_page(ad).encode('utf-8')
+    return ads, search_urls, routes
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serve pre-rendered pages from server.routes"""
+
+    def do_GET(self):
+        body = self.server.routes.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server():
+    """Start a local otodom stand-in on a free port"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.routes = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def load_functions(script, names):
+    """Load selected functions from a pipeline script without running its top-level code"""
+    path = os.path.join(REPO_DIR, script)
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    body = [node for node in tree.body
+            if isinstance(node, (ast.Import, ast.ImportFrom))
+            or (isinstance(node, ast.FunctionDef) and node.name in names)]
+    namespace = {'__name__': script, '__file__': path}
+    exec(compile(ast.Module(body=body, type_ignores=[]), path, 'exec'), namespace)
+    return namespace
+
+
+def load_predict_block():
+    """Compile the prediction part of rental_price_app.py (everything before it renders results)"""
+    path = os.path.join(REPO_DIR, 'rental_price_app.py')
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in tree.body:
+        if isinstance(node, ast.If) and isinstance(node.test, ast.Name) and node.test.id == 'submitted':
+            body = []
+            for statement in node.body:
+                if any(isinstance(n, ast.Name) and n.id == 'st' for n in ast.walk(statement)):
+                    break
+                body.append(statement)
+            return compile(ast.Module(body=body, type_ignores=[]), path, 'exec')
+    raise RuntimeError("Prediction block not found in rental_price_app.py")
+
+
+def load_notebook_cells(notebook):
+    """Return the code cells of a notebook as compiled code objects"""
+    path = os.path.join(REPO_DIR, notebook)
+    with open(path, 'r', encoding='utf-8') as f:
+        nb = json.load(f)
+    return [compile(''.join(cell['source']), f"{notebook}[{i}]", 'exec')
+            for i, cell in enumerate(nb['cells']) if cell['cell_type'] == 'code']
+
+
+def build_model_artifacts(path, seed):
+    """Train a model on synthetic features and save it in the layout rental_price_app.py loads"""
+    rng = np.random.default_rng(seed)
+    n = 2000
+    X = pd.DataFrame(0.0, index=range(n), columns=APP_FEATURES)
+    for feature in APP_STANDARDIZED:
+        X[f'{feature}_std'] = rng.normal(size=n)
+    X['rooms_num'] = rng.integers(1, 6, size=n)
+    district_idx = rng.integers(0, len(APP_DISTRICTS), size=n)
+    for i, district in enumerate(APP_DISTRICTS):
+        X[f'district_{district}'] = (district_idx == i).astype(int)
+    for feature in ['building_type_apartment', 'building_type_tenement', 'window_plastic',
+                    'window_wooden', 'user_type_agency', 'is_top_floor']:
+        X[feature] = rng.integers(0, 2, size=n)
+    for feature, high in [('kitchen_furniture_score', 8), ('security_score', 6), ('tech_score', 4),
+                          ('premium_amenities_score', 4), ('infrastructure_score', 4), ('interior_score', 6)]:
+        X[feature] = rng.integers(0, high, size=n)
+    X['area_per_room'] = X['area_std'] * X['rooms_num']
+    X['area_distance_interaction'] = X['area_std'] * X['distance_to_center_std']
+    X['high_premium_district'] = X[HIGH_PREMIUM_DISTRICTS].max(axis=1)
+    X['building_age'] = X['build_year_std'] * -1
+    X['top_floor_distance'] = X['building_floors_num_std'] - X['floor_numeric_std']
+    y = (8.3 + 0.35 * X['area_std'] - 0.15 * X['distance_to_center_std']
+         + 0.2 * X['high_premium_district'] + rng.normal(scale=0.1, size=n))
+
+    model = RandomForestRegressor(n_estimators=100, random_state=42)
+    model.fit(X, y)
+    joblib.dump({
+        'model': model,
+        'feature_names': APP_FEATURES,
+        'high_premium_districts': HIGH_PREMIUM_DISTRICTS,
+        'standardization_params': {
+            'area': {'mean': 55.0, 'std': 25.0},
+            'distance_to_center': {'mean': 6.0, 'std': 3.5},
+            'building_floors_num': {'mean': 7.0, 'std': 4.5},
+            'floor_numeric': {'mean': 3.0, 'std': 2.8},
+            'build_year': {'mean': 1995.0, 'std': 30.0},
+            'relative_floor_position': {'mean': 0.45, 'std': 0.3},
+        },
+    }, path)
+
+
+def make_form_inputs(rng):
+    """Random values for the rental_price_app.py prediction form"""
+    building_floors_num = rng.randint(1, 50)
+    return {
+        'area': rng.uniform(15.0, 300.0),
+        'rooms_num': rng.randint(1, 10),
+        'build_year': rng.randint(1900, 2025),
+        'floor_numeric': rng.randint(0, building_floors_num),
+        'building_floors_num': building_floors_num,
+        'distance_to_center': rng.uniform(0.1, 25.0),
+        'districts': rng.choice(APP_DISTRICTS),
+        'building_type': rng.choice(['Apartment', 'Block', 'Tenement', 'Other']),
+        'window_type': rng.choice(['Plastic', 'Wooden', 'Other']),
+        'is_agency': rng.random() < 0.5,
+        'kitchen_furniture_score': rng.randint(0, 7),
+        'security_score': rng.randint(0, 5),
+        'tech_score': rng.randint(0, 3),
+        'premium_amenities_score': rng.randint(0, 3),
+        'infrastructure_score': rng.randint(0, 3),
+        'interior_score': rng.randint(0, 5),
+    }
+
+
+@contextlib.contextmanager
+def in_directory(path):
+    """Run the pipeline scripts inside the work directory, silencing their prints"""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        os.chdir(previous)
+
+
+class Pipeline:
+    """Every stage of the project, driven against synthetic fixtures"""
+
+    def __init__(self, args, workdir):
+        self.args = args
+        self.workdir = workdir
+        self.server, self.base_url = start_stub_server()
+        ads, self.search_urls, self.server.routes = generate_fixtures(
+            args.listings, args.per_page, self.base_url, args.seed)
+        self.listing_urls = [ad['url'] for ad in ads]
+        self.listing_html = [self.server.routes[url[len(self.base_url):]].decode('utf-8')
+                             for url in self.listing_urls]
+        del ads
+
+        scraper = load_functions('2-1.py', {'get_otodom_listings', 'extract_urls'})
+        self.get_otodom_listings = scraper['get_otodom_listings']
+        self.extract_urls = scraper['extract_urls']
+        details = load_functions('2-2.py', {'extract_json_data', 'extract_details_from_json',
+                                            'scrape_rental_details'})
+        self.extract_json_data = details['extract_json_data']
+        self.extract_details_from_json = details['extract_details_from_json']
+        self.scrape_rental_details = details['scrape_rental_details']
+        self.soups = []
+
+        # Build warsaw_rentals.txt the way 2-2.py does
+        rows = [{'url': url, 'raw_json': self.extract_details_from_json(self.extract_json_data(html))['raw_json']}
+                for url, html in zip(self.listing_urls, self.listing_html)]
+        self.csv_path = os.path.join(workdir, 'warsaw_rentals.txt')
+        pd.DataFrame(rows).to_csv(self.csv_path, index=False)
+
+        # A second work directory holding only the raw archive, so 2-3a.py streams from it
+        self.archive = None
+        if raw_archive.zstd is not None:
+            self.archive_workdir = os.path.join(workdir, 'archived')
+            self.archive_path = os.path.join(self.archive_workdir, raw_archive.ARCHIVE_DIR)
+            raw_archive.import_csv(self.csv_path, self.archive_path, args.seed)
+            added, _ = raw_archive.import_csv(self.csv_path, self.archive_path, args.seed)
+            if added:
+                raise RuntimeError(f"Re-importing an unchanged CSV added {added} payloads")
+            self.archive = raw_archive.RawArchive(self.archive_path)
+            self.listing_ids = [raw_archive.listing_id_from_url(url) for url in self.listing_urls]
+            random.Random(args.seed).shuffle(self.listing_ids)
+        else:
+            print("zstandard is not installed, skipping the raw archive stages")
+
+        self.preprocessing_cells = load_notebook_cells('2-4.ipynb')
+        self.artifacts_path = os.path.join(workdir, 'warsaw_rental_model_artifacts.pkl')
+        build_model_artifacts(self.artifacts_path, args.seed)
+        self.artifacts = joblib.load(self.artifacts_path)
+        self.predict_block = load_predict_block()
+        rng = random.Random(args.seed)
+        self.form_inputs = [make_form_inputs(rng) for _ in range(args.predictions)]
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stages(self):
+        """(name, unit, callable) in pipeline order; each callable returns the items processed"""
+        stages = [
+            ('search_fetch', 'pages', self.search_fetch),
+            ('extract_urls', 'pages', self.run_extract_urls),
+            ('listing_fetch', 'listings', self.listing_fetch),
+            ('extract_json_data', 'listings', self.run_extract_json_data),
+            ('flatten', 'listings', self.flatten),
+            ('preprocess', 'listings', self.preprocess),
+            ('load_model', 'loads', self.load_model),
+            ('predict', 'predictions', self.predict),
+        ]
+        if self.archive is None:
+            return stages
+        return stages + [
+            ('archive_import', 'listings', self.archive_import),
+            ('csv_decode', 'listings', self.csv_decode),
+            ('archive_decode', 'listings', self.archive_decode),
+            ('archive_get', 'listings', self.archive_get),
+            ('flatten_archive', 'listings', self.flatten_archive),
+        ]
+
+    def search_fetch(self):
+        self.soups = [self.get_otodom_listings(url) for url in self.search_urls]
+        return len(self.soups)
+
+    def run_extract_urls(self):
+        urls = [url for soup in self.soups for url in self.extract_urls(soup)]
+        if len(urls) != len(self.listing_urls):
+            raise RuntimeError(f"extract_urls found {len(urls)} of {len(self.listing_urls)} listings")
+        return len(self.soups)
+
+    def listing_fetch(self):
+        for url in self.listing_urls:
+            if not self.scrape_rental_details(url)['raw_json']:
+                raise RuntimeError(f"No ad payload scraped from {url}")
+        return len(self.listing_urls)
+
+    def run_extract_json_data(self):
+        for html in self.listing_html:
+            self.extract_details_from_json(self.extract_json_data(html))
+        return len(self.listing_html)
+
+    def check_flattened(self, workdir):
+        """Fail if 2-3a.py dropped listings or fell into its per-row error path"""
+        df = pd.read_csv(os.path.join(workdir, 'output_rentals.csv'))
+        if len(df) != self.args.listings:
+            raise RuntimeError(f"2-3a.py wrote {len(df)} of {self.args.listings} listings")
+        missing = df['price'].isna().sum()
+        if missing:
+            raise RuntimeError(f"2-3a.py wrote {missing} rows without a price")
+        return df
+
+    def flatten(self):
+        with in_directory(self.workdir):
+            runpy.run_path(os.path.join(REPO_DIR, '2-3a.py'), run_name='__main__')
+        self.check_flattened(self.workdir)
+        return self.args.listings
+
+    def preprocess(self):
+        namespace = {'__name__': '__main__'}
+        with in_directory(self.workdir):
+            for cell in self.preprocessing_cells:
+                exec(cell, namespace)
+        # 2-4.ipynb keeps every listing with both a price and a rent
+        flattened = pd.read_csv(os.path.join(self.workdir, 'output_rentals.csv'))
+        expected = (flattened['price'].notna() & flattened['rent'].notna()).sum()
+        clean = pd.read_csv(os.path.join(self.workdir, 'clean1.csv'))
+        if len(clean) != expected or clean['total_price'].isna().any():
+            raise RuntimeError(f"2-4.ipynb wrote {len(clean)} rows, expected {expected} with a total_price")
+        return self.args.listings
+
+    def load_model(self):
+        joblib.load(self.artifacts_path)
+        return 1
+
+    def predict(self):
+        for inputs in self.form_inputs:
+            namespace = {
+                'pd': pd,
+                'np': np,
+                'model': self.artifacts['model'],
+                'feature_names': self.artifacts['feature_names'],
+                'high_premium_districts': self.artifacts['high_premium_districts'],
+                'standardization_params': self.artifacts.get('standardization_params', {}),
+            }
+            namespace.update(inputs)
+            exec(self.predict_block, namespace)
+        return len(self.form_inputs)
+
+    def archive_import(self):
+        path = os.path.join(self.workdir, 'import', raw_archive.ARCHIVE_DIR)
+        shutil.rmtree(path, ignore_errors=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            raw_archive.import_csv(self.csv_path, path, self.args.seed)
+        return self.args.listings
+
+    def csv_decode(self):
+        df = pd.read_csv(self.csv_path)
+        for raw_json in df['raw_json']:
+            json.loads(raw_json)
+        return len(df)
+
+    def archive_decode(self):
+        count = 0
+        for row in self.archive.iter_rows():
+            json.loads(row['raw_json'])
+            count += 1
+        return count
+
+    def archive_get(self):
+        for listing_id in self.listing_ids:
+            json.loads(self.archive.get(listing_id))
+        return len(self.listing_ids)
+
+    def flatten_archive(self):
+        with in_directory(self.archive_workdir):
+            runpy.run_path(os.path.join(REPO_DIR, '2-3a.py'), run_name='__main__')
+        self.check_flattened(self.archive_workdir)
+        return self.args.listings
+
+    def sizes(self):
+        if self.archive is None:
+            return None
+        return {'csv_bytes': os.path.getsize(self.csv_path), 'archive_bytes': self.archive.stats()['total_bytes']}
+
+
+def measure(stage, repeat, min_time):
+    """Median wall time over at least `repeat` runs and `min_time` seconds, then one traced run for peak memory"""
+    timings = []
+    while len(timings) < repeat or sum(timings) < min_time:
+        start = time.perf_counter()
+        items = stage()
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings)
+    tracemalloc.start()
+    try:
+        stage()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'items': items,
+        'runs': len(timings),
+        'seconds': median,
+        'best_seconds': min(timings),
+        'throughput': items / median if median > 0 else float('inf'),
+        'peak_memory_mb': peak / (1024 * 1024),
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return (stage, message) for every stage that regressed beyond tolerance"""
+    regressions = []
+    for name, result in results['stages'].items():
+        previous = baseline['stages'].get(name)
+        if not previous:
+            continue
+        if result['throughput'] < previous['throughput'] * (1 - tolerance):
+            regressions.append((name, f"throughput {result['throughput']:.1f} < baseline {previous['throughput']:.1f}"))
+        if result['peak_memory_mb'] > previous['peak_memory_mb'] * (1 + tolerance):
+            regressions.append((name, f"peak memory {result['peak_memory_mb']:.1f} MB > baseline {previous['peak_memory_mb']:.1f} MB"))
+    return regressions
+
+
+def print_report(results, baseline=None):
+    header = f"{'stage':<20}{'items':>8}{'seconds':>10}{'items/s':>12}{'peak MB':>10}"
+    if baseline:
+        header += f"{'vs base':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results['stages'].items():
+        marker = '*' if name in NATIVE_MEMORY_STAGES else ' '
+        line = (f"{name:<20}{result['items']:>8}{result['seconds']:>10.3f}"
+                f"{result['throughput']:>12.1f}{result['peak_memory_mb']:>9.1f}{marker}")
+        previous = baseline['stages'].get(name) if baseline else None
+        if previous:
+            line += f"{result['throughput'] / previous['throughput']:>9.2f}x"
+        print(line)
+    if NATIVE_MEMORY_STAGES & set(results['stages']):
+        print("* Python allocations only: zstd's native buffers are not traced, "
+              "so this is not comparable with the CSV stages")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic otodom data")
+    parser.add_argument('--listings', type=int, default=500, help="number of synthetic listings")
+    parser.add_argument('--per-page', type=int, default=36, help="listing cards per search page")
+    parser.add_argument('--predictions', type=int, default=200, help="number of app predictions")
+    parser.add_argument('--repeat', type=int, default=5, help="minimum timed runs per stage (median is kept)")
+    parser.add_argument('--min-time', type=float, default=1.0,
+                        help="keep repeating a stage until its runs add up to this many seconds")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--stages', nargs='+', help="only report these stages")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if args.min_time < 0:
+        parser.error("--min-time must not be negative")
+    return args
+
+
+def main():
+    args = parse_args()
+    results = {
+        'created': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {'listings': args.listings, 'per_page': args.per_page,
+                   'predictions': args.predictions, 'repeat': args.repeat, 'min_time': args.min_time,
+                   'seed': args.seed},
+        'stages': {},
+    }
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('config') != results['config']:
+            print(f"Baseline {args.baseline} was recorded with {baseline.get('config')}, "
+                  f"this run uses {results['config']}. Re-run with the same options or --save-baseline.")
+            return 2
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"Generating {args.listings} synthetic listings...")
+        pipeline = Pipeline(args, workdir)
+        try:
+            # Stages depend on earlier outputs, so every stage runs even if not reported
+            for name, unit, stage in pipeline.stages():
+                print(f"Running {name}...")
+                result = measure(stage, args.repeat, args.min_time)
+                result['unit'] = unit
+                if not args.stages or name in args.stages:
+                    results['stages'][name] = result
+            results['sizes'] = pipeline.sizes()
+        finally:
+            pipeline.close()
+
+    print()
+    print_report(results, baseline)
+    sizes = results['sizes']
+    if sizes:
+        print(f"\nwarsaw_rentals.txt: {sizes['csv_bytes'] / 1024:.0f} KB, "
+              f"raw archive: {sizes['archive_bytes'] / 1024:.0f} KB "
+              f"({sizes['csv_bytes'] / sizes['archive_bytes']:.1f}x smaller)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if baseline:
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for name, message in regressions:
+                print(f"- {name}: {message}")
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
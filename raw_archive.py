@@ -0,0 +1,280 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+# Constants
+ARCHIVE_DIR = 'warsaw_rentals_archive'
+CSV_FILE = 'warsaw_rentals.txt'
+PAYLOADS_FILE = 'payloads.bin'
+INDEX_FILE = 'index.jsonl'
+DICTIONARY_FILE = 'dictionary.zstd'
+DICTIONARY_SIZE = 112640  # zstd's default dictionary size
+DICTIONARY_SAMPLES = 2000
+MIN_DICTIONARY_SAMPLES = 16
+COMPRESSION_LEVEL = 19
+
+
+def listing_id_from_url(url):
+    """Return otodom's public listing ID (the '-ID4t9d3' suffix) or the URL itself"""
+    match = re.search(r'-ID(\w+)$', url)
+    return match.group(1) if match else url
+
+
+def archive_is_current(archive_path=ARCHIVE_DIR, csv_path=CSV_FILE):
+    """True if zstandard is installed and the archive index is non-empty and at least as new as the CSV"""
+    index_path = os.path.join(archive_path, INDEX_FILE)
+    if zstd is None or not os.path.exists(index_path) or os.path.getsize(index_path) == 0:
+        return False
+    return not os.path.exists(csv_path) or os.path.getmtime(index_path) >= os.path.getmtime(csv_path)
+
+
+class RawArchive:
+    """Raw `ad` payloads stored as individually compressed zstd frames.
+
+    payloads.bin holds one frame per unique payload (content-addressed by SHA-256),
+    index.jsonl maps listing IDs to frame offsets and dictionary.zstd is the shared
+    dictionary the frames are compressed with. Re-crawls append to both files;
+    an identical payload is stored once no matter how many listings point at it.
+    Listings scraped without a payload are kept as url-only entries.
+    """
+
+    def __init__(self, path=ARCHIVE_DIR):
+        if zstd is None:
+            raise ImportError("The raw archive needs the zstandard package (pip install zstandard)")
+        self.path = path
+        self.entries = {}   # listing id -> list of index entries, oldest first
+        self.blobs = {}     # content hash -> (offset, length)
+        index_path = os.path.join(path, INDEX_FILE)
+        if os.path.exists(index_path):
+            self._load_index(index_path)
+
+        dictionary_path = os.path.join(path, DICTIONARY_FILE)
+        self.dictionary = None
+        if os.path.exists(dictionary_path):
+            with open(dictionary_path, 'rb') as f:
+                self.dictionary = zstd.ZstdCompressionDict(f.read())
+        self._compressor = None
+        self._decompressor = zstd.ZstdDecompressor(dict_data=self.dictionary)
+        self._payloads = None
+
+    @classmethod
+    def create(cls, path, samples, level=COMPRESSION_LEVEL):
+        """Create an empty archive with a dictionary trained on sample payloads"""
+        if zstd is None:
+            raise ImportError("The raw archive needs the zstandard package (pip install zstandard)")
+        os.makedirs(path, exist_ok=True)
+        samples = [sample.encode('utf-8') if isinstance(sample, str) else sample for sample in samples]
+        if len(samples) >= MIN_DICTIONARY_SAMPLES:
+            dictionary = zstd.train_dictionary(DICTIONARY_SIZE, samples, level=level)
+            with open(os.path.join(path, DICTIONARY_FILE), 'wb') as f:
+                f.write(dictionary.as_bytes())
+        else:
+            print(f"Only {len(samples)} samples, archive will be compressed without a dictionary")
+        open(os.path.join(path, PAYLOADS_FILE), 'ab').close()
+        open(os.path.join(path, INDEX_FILE), 'a').close()
+        return cls(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._payloads is not None:
+            self._payloads.close()
+            self._payloads = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, listing_id):
+        return listing_id in self.entries
+
+    def _load_index(self, index_path):
+        with open(index_path, 'rb') as f:
+            data = f.read()
+        # A crash in add() can leave a partial last line; drop it so the next append starts clean
+        complete = data.rfind(b'\n') + 1
+        if complete < len(data):
+            print(f"Dropping incomplete last entry of {index_path}")
+            with open(index_path, 'r+b') as f:
+                f.truncate(complete)
+        for line in data[:complete].decode('utf-8').splitlines():
+            if line.strip():
+                self._register(json.loads(line))
+
+    def _register(self, entry):
+        self.entries.setdefault(entry['id'], []).append(entry)
+        if entry['hash'] is not None:
+            self.blobs.setdefault(entry['hash'], (entry['offset'], entry['length']))
+
+    def add(self, url, raw_json, fetched_at=None, level=COMPRESSION_LEVEL):
+        """Archive one payload; returns False if it was already the listing's latest version
+
+        A missing payload (raw_json None) is recorded as a url-only entry, unless the
+        listing already has a version, which is kept rather than hidden by a failed scrape.
+        """
+        listing_id = listing_id_from_url(url)
+        history = self.entries.get(listing_id)
+        if raw_json is None:
+            if history:
+                return False
+            data = content_hash = None
+        else:
+            data = raw_json.encode('utf-8')
+            content_hash = hashlib.sha256(data).hexdigest()
+        if history and history[-1]['hash'] == content_hash:
+            return False
+
+        if content_hash is None:
+            offset = length = None
+        elif content_hash not in self.blobs:
+            if self._compressor is None:
+                self._compressor = zstd.ZstdCompressor(level=level, dict_data=self.dictionary)
+            frame = self._compressor.compress(data)
+            with open(os.path.join(self.path, PAYLOADS_FILE), 'ab') as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(frame)
+            length = len(frame)
+            self.blobs[content_hash] = (offset, length)
+        else:
+            offset, length = self.blobs[content_hash]
+
+        entry = {
+            'id': listing_id,
+            'url': url,
+            'hash': content_hash,
+            'offset': offset,
+            'length': length,
+            'fetched_at': fetched_at or datetime.now().isoformat(),
+        }
+        with open(os.path.join(self.path, INDEX_FILE), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+        self.entries.setdefault(listing_id, []).append(entry)
+        return True
+
+    def _read(self, entry):
+        if entry['hash'] is None:
+            return None
+        if self._payloads is None:
+            self._payloads = open(os.path.join(self.path, PAYLOADS_FILE), 'rb')
+        self._payloads.seek(entry['offset'])
+        return self._decompressor.decompress(self._payloads.read(entry['length'])).decode('utf-8')
+
+    def get(self, listing_id, version=-1):
+        """Return the raw JSON string of a listing (latest version by default), or None"""
+        history = self.entries.get(listing_id)
+        if not history or not -len(history) <= version < len(history):
+            return None
+        return self._read(history[version])
+
+    def history(self, listing_id):
+        """Return the index entries of every archived version of a listing"""
+        return list(self.entries.get(listing_id, []))
+
+    def iter_rows(self):
+        """Yield {'url', 'raw_json'} for the latest version of every listing
+
+        Listings come in the order they were first archived; raw_json is None for
+        url-only entries. Earlier versions of a listing are skipped.
+        """
+        for history in self.entries.values():
+            entry = history[-1]
+            yield {'url': entry['url'], 'raw_json': self._read(entry)}
+
+    def stats(self):
+        payloads_size = os.path.getsize(os.path.join(self.path, PAYLOADS_FILE))
+        files = [PAYLOADS_FILE, INDEX_FILE, DICTIONARY_FILE]
+        return {
+            'listings': len(self.entries),
+            'versions': sum(len(history) for history in self.entries.values()),
+            'unique_payloads': len(self.blobs),
+            'payloads_bytes': payloads_size,
+            'total_bytes': sum(os.path.getsize(os.path.join(self.path, name))
+                               for name in files if os.path.exists(os.path.join(self.path, name))),
+        }
+
+
+def import_csv(csv_path, archive_path=ARCHIVE_DIR, seed=42):
+    """Import a 2-2.py style CSV (url, raw_json) into the archive, training the dictionary if new
+
+    Only the last row with a payload is imported for each listing (or its last row if it
+    never had one), so importing an unchanged CSV again adds nothing.
+    """
+    df = pd.read_csv(csv_path)
+    df['listing_id'] = df['url'].map(listing_id_from_url)
+    order = df['listing_id'].drop_duplicates()
+    has_payload = df['raw_json'].notna()
+    latest = df[has_payload].drop_duplicates('listing_id', keep='last').set_index('listing_id')
+    url_only = df[~has_payload & ~df['listing_id'].isin(latest.index)]
+    latest = pd.concat([latest, url_only.drop_duplicates('listing_id', keep='last').set_index('listing_id')])
+    latest = latest.loc[order]
+
+    if not os.path.exists(os.path.join(archive_path, INDEX_FILE)):
+        payloads = latest['raw_json'].dropna().tolist()
+        rng = random.Random(seed)
+        samples = rng.sample(payloads, min(len(payloads), DICTIONARY_SAMPLES))
+        archive = RawArchive.create(archive_path, samples)
+    else:
+        archive = RawArchive(archive_path)
+
+    added = 0
+    with archive:
+        for url, raw_json in zip(latest['url'], latest['raw_json']):
+            if archive.add(url, None if pd.isna(raw_json) else raw_json):
+                added += 1
+    # Mark the archive as up to date with this CSV even if nothing new was added
+    os.utime(os.path.join(archive_path, INDEX_FILE))
+    return added, len(df)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compressed archive of raw otodom ad payloads")
+    parser.add_argument('--archive', default=ARCHIVE_DIR, help="archive directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help="import a CSV written by 2-2.py")
+    import_parser.add_argument('csv', nargs='?', default=CSV_FILE)
+    get_parser = commands.add_parser('get', help="print the payload of a listing")
+    get_parser.add_argument('listing_id')
+    commands.add_parser('stats', help="print archive statistics")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == 'import':
+        added, total = import_csv(args.csv, args.archive)
+        print(f"Archived {added} new payloads out of {total} rows from {args.csv}")
+        return 0
+
+    if not os.path.exists(os.path.join(args.archive, INDEX_FILE)):
+        print(f"No archive found in {args.archive}")
+        return 1
+    with RawArchive(args.archive) as archive:
+        if args.command == 'get':
+            raw_json = archive.get(args.listing_id)
+            if raw_json is None:
+                print(f"Listing {args.listing_id} not found")
+                return 1
+            print(raw_json)
+        elif args.command == 'stats':
+            for key, value in archive.stats().items():
+                print(f"{key}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())